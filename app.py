@@ -1,50 +1,117 @@
 # file: app.py
-from flask import Flask, jsonify, request
+import math
+
+import orjson
+from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
-from game import GAME
+from game import (DIAS_TOTALES, EXPLICACIONES, MAX_CELDAS_BARRIDO, MAX_DIAS_BARRIDO,
+                  MAX_OPERACIONES_LOTE, MAX_PARTIDAS_BARRIDO, MAX_PRECIOS_BARRIDO,
+                  MAX_PRODUCCION_BARRIDO, LemonadeGame)
+from json_provider import OPCIONES_ORJSON, OrjsonProvider, respuesta_json
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
+juego = LemonadeGame()
+# los textos explicativos se serializan una sola vez, al importar
+EXPLICACIONES_JSON = orjson.dumps(EXPLICACIONES, option=OPCIONES_ORJSON)
+
 @app.route("/health")
 def health():
     return jsonify({"ok": True, "msg": "alive"})
 
-@app.route("/state", methods=["GET"])
-def state():
-    return jsonify(GAME.get_state())
+@app.route("/")
+def index():
+    # servir index.html desde templates para pruebas locales o Render
+    try:
+        return send_from_directory("templates", "index.html")
+    except Exception:
+        return jsonify({"ok": False, "mensaje": "Falta el frontend. Sube templates/index.html"}), 404
+
+@app.route("/api/state", methods=["GET"])
+def api_state():
+    """Devuelve el estado completo para el frontend."""
+    return Response(juego.estado_publico_json(), mimetype="application/json")
 
-@app.route("/reset", methods=["POST"])
-def reset():
-    return jsonify(GAME.reset())
+@app.route("/api/explanations", methods=["GET"])
+def api_explanations():
+    """Textos explicativos de balance, cuenta de resultados y flujo de caja (fijos)."""
+    return Response(EXPLICACIONES_JSON, mimetype="application/json")
 
-@app.route("/buy", methods=["POST"])
-def buy():
+@app.route("/api/buy", methods=["POST"])
+def api_buy():
     data = request.get_json() or {}
-    lemons = data.get("lemons", 0)
-    sugar = data.get("sugar", 0)
-    cups = data.get("cups", 0)
-    ok = GAME.buy(lemons, sugar, cups)
-    return jsonify({"ok": ok, "state": GAME.get_state()})
-
-@app.route("/set_price", methods=["POST"])
-def set_price():
+    lim = int(data.get("limones", 0))
+    az = int(data.get("azucar", 0))
+    vas = int(data.get("vasos", 0))
+    res = juego.comprar_ingredientes(lim, az, vas)
+    return jsonify(res)
+
+@app.route("/api/produce", methods=["POST"])
+def api_produce():
+    data = request.get_json() or {}
+    qty = int(data.get("cantidad", 0))
+    res = juego.producir(qty)
+    return jsonify(res)
+
+@app.route("/api/set_price", methods=["POST"])
+def api_set_price():
     data = request.get_json() or {}
-    price = data.get("price", GAME.get_state().get("price", 1.0))
-    ok = GAME.set_price(price)
-    return jsonify({"ok": ok, "state": GAME.get_state()})
+    precio = float(data.get("precio", juego.estado.precio_venta))
+    res = juego.fijar_precio(precio)
+    return jsonify(res)
 
-@app.route("/produce", methods=["POST"])
-def produce():
+@app.route("/api/simulate", methods=["POST"])
+def api_simulate():
     data = request.get_json() or {}
-    qty = data.get("qty", 0)
-    ok = GAME.produce(qty)
-    return jsonify({"ok": ok, "state": GAME.get_state()})
-
-@app.route("/simulate", methods=["POST"])
-def simulate():
-    state = GAME.simulate_day()
-    return jsonify({"ok": True, "state": state})
+    gasto_pub = float(data.get("gasto_publicidad", 0.0))
+    # resultado del día y nuevo estado público en una sola llamada (un solo lock)
+    return respuesta_json(juego.simular_dia(gasto_pub, incluir_estado=True))
+
+@app.route("/api/batch", methods=["POST"])
+def api_batch():
+    """Varias acciones en una sola petición: {"operaciones": [{"op": ..., "args": {...}}, ...]}."""
+    data = request.get_json() or {}
+    operaciones = data.get("operaciones")
+    if not isinstance(operaciones, list) or len(operaciones) > MAX_OPERACIONES_LOTE:
+        return jsonify({"ok": False, "mensaje": f"Indica una lista de hasta {MAX_OPERACIONES_LOTE} operaciones."}), 400
+    return respuesta_json(juego.ejecutar_lote(operaciones))
+
+@app.route("/api/sweep", methods=["POST"])
+def api_sweep():
+    """Barrido de precios: simula muchas partidas por precio y devuelve estadísticas."""
+    data = request.get_json() or {}
+    precios = data.get("precios")
+    if not isinstance(precios, list):
+        return jsonify({"ok": False, "mensaje": "Indica los precios como una lista."}), 400
+    try:
+        precios = [float(p) for p in precios]
+        n_partidas = int(data.get("partidas", 1000))
+        dias = int(data.get("dias", DIAS_TOTALES))
+        produccion = data.get("produccion_diaria")
+        produccion = None if produccion is None else int(produccion)
+        semilla = data.get("semilla")
+        semilla = None if semilla is None else int(semilla)
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "mensaje": "Parámetros inválidos."}), 400
+    if not (0 < len(precios) <= MAX_PRECIOS_BARRIDO) or not all(math.isfinite(p) and p > 0 for p in precios):
+        return jsonify({"ok": False, "mensaje": f"Indica entre 1 y {MAX_PRECIOS_BARRIDO} precios mayores que 0."}), 400
+    if not (0 < n_partidas <= MAX_PARTIDAS_BARRIDO) or not (0 < dias <= MAX_DIAS_BARRIDO):
+        return jsonify({"ok": False, "mensaje": f"Partidas entre 1 y {MAX_PARTIDAS_BARRIDO} y días entre 1 y {MAX_DIAS_BARRIDO}."}), 400
+    if len(precios) * n_partidas * dias > MAX_CELDAS_BARRIDO:
+        return jsonify({"ok": False, "mensaje": f"Barrido demasiado grande: precios x partidas x días debe ser <= {MAX_CELDAS_BARRIDO}."}), 400
+    if semilla is not None and semilla < 0:
+        return jsonify({"ok": False, "mensaje": "La semilla debe ser un entero >= 0."}), 400
+    if produccion is not None and not (0 <= produccion <= MAX_PRODUCCION_BARRIDO):
+        return jsonify({"ok": False, "mensaje": f"La producción diaria debe estar entre 0 y {MAX_PRODUCCION_BARRIDO}."}), 400
+    res = LemonadeGame.simular_barrido(precios, n_partidas, dias, produccion, semilla)
+    return respuesta_json({"ok": True, "barrido": res})
+
+@app.route("/api/reset", methods=["POST"])
+def api_reset():
+    estado = juego.reset()
+    return jsonify({"ok": True, "estado": estado})
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,2 @@
+# conftest.py vacío en la raíz: pytest añade este directorio a sys.path, así los
+# tests importan game y app tanto con "pytest" como con "python -m pytest".
@@ -1,8 +1,8 @@
 # file: game.py
 """
 Juego-simulador didáctico de un puesto de limonada para Bachillerato.
-Contiene toda la lógica del juego y una API REST (Flask) para que el frontend
-consuma los datos.
+Contiene toda la lógica del juego; la API REST (Flask) que consume el frontend
+está en app.py.
 
 Conceptos contables modelados:
 - Balance (Activo / Pasivo + Patrimonio Neto)
@@ -14,12 +14,27 @@ Conceptos contables modelados:
 Autor: Código didáctico (en español)
 """
 
-from dataclasses import dataclass, asdict
-from flask import Flask, jsonify, request, send_from_directory
+from bisect import bisect
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import accumulate
 import random
 import math
 import threading
 
+import numpy as np
+import orjson
+try:
+    from numba import njit
+    NUMBA_DISPONIBLE = True
+except ImportError:  # numba es opcional: sin él, las funciones se ejecutan en Python normal
+    NUMBA_DISPONIBLE = False
+
+    def njit(**_opciones):
+        return lambda funcion: funcion
+
+from json_provider import OPCIONES_ORJSON
+
 # ---------------------- CONSTANTES DE COSTES ----------------------
 COSTE_LIMON = 0.50      # coste por limón (€)
 COSTE_AZUCAR = 0.10     # coste por ración de azúcar (€) (p. ej. por cucharada)
@@ -32,12 +47,70 @@ INGREDIENTES_POR_VASO = {
     "azucar": 1,
     "vaso": 1
 }
+# Valores precalculados (se usan en cada producción y en cada cálculo de demanda)
+INGR_LIMON = INGREDIENTES_POR_VASO["limon"]
+INGR_AZUCAR = INGREDIENTES_POR_VASO["azucar"]
+INGR_VASO = INGREDIENTES_POR_VASO["vaso"]
+COSTE_POR_VASO = COSTE_LIMON * INGR_LIMON + COSTE_AZUCAR * INGR_AZUCAR + COSTE_VASO * INGR_VASO
 
 # Días por defecto del juego
 DIAS_TOTALES = 7
 
+# Días que se guardan en el historial (los que se muestran al alumno)
+HISTORIAL_MAX = 10
+
+# Climas posibles, su probabilidad y el rango de demanda base (clientes potenciales)
+CLIMAS = ("Caluroso", "Templado", "Frío")
+PROB_CLIMAS = (0.35, 0.50, 0.15)
+# probabilidades acumuladas (0.35, 0.85, 1.0): basta un random() y una búsqueda binaria
+PROB_CLIMAS_ACUM = tuple(accumulate(PROB_CLIMAS))
+DEMANDA_BASE_CLIMA = {
+    "Caluroso": (60, 110),
+    "Templado": (30, 70),
+    "Frío": (5, 35)
+}
+
+# Penalización de la demanda según ratio precio/coste: el tramo se busca en una
+# tabla ordenada (sin cadena de if), igual en la partida y en el barrido con NumPy.
+#   ratio <= 0.8 -> x1.15 | <= 1.5 -> x1.0 | <= 2.0 -> x0.8 | <= 3.0 -> x0.6 | > 3.0 -> x0.3
+# Las tuplas son para el cálculo de un solo día; los arrays, para np.searchsorted en el barrido.
+UMBRAL_PRECIO_1, UMBRAL_PRECIO_2, UMBRAL_PRECIO_3, UMBRAL_PRECIO_4 = 0.8, 1.5, 2.0, 3.0
+FACTORES_PRECIO_T = (1.15, 1.0, 0.8, 0.6, 0.3)
+UMBRALES_PRECIO = np.array([UMBRAL_PRECIO_1, UMBRAL_PRECIO_2, UMBRAL_PRECIO_3, UMBRAL_PRECIO_4])
+FACTORES_PRECIO = np.array(FACTORES_PRECIO_T)
+
+# Textos explicativos de los estados financieros. No cambian nunca, así que no
+# viajan en cada /api/state: el frontend los pide una vez a /api/explanations.
+EXPL_ACTIVO = "El ACTIVO muestra lo que tiene la empresa (caja y existencias)."
+EXPL_PASIVO = "El PASIVO y PATRIMONIO muestran cómo se ha financiado (deudas y aportaciones/beneficios)."
+EXPL_CUENTA_RESULTADOS = "Aquí ves cuánto has vendido (ingresos) y cuánto te ha costado vender (coste de ventas)."
+EXPL_FLUJO_EFECTIVO = "La caja muestra cuánto dinero tienes ahora mismo (cobros y pagos reales)."
+EXPLICACIONES = {
+    "activo": EXPL_ACTIVO,
+    "pasivo": EXPL_PASIVO,
+    "cuenta_resultados": EXPL_CUENTA_RESULTADOS,
+    "flujo_efectivo": EXPL_FLUJO_EFECTIVO
+}
+
+# Límites de la partida: con precio, calidad y compras acotados, ningún entero del
+# estado sale de int64 (numba lo exige en la demanda y orjson al serializar)
+MAX_PRECIO = 100.0
+MAX_NIVEL_CALIDAD = 50
+MAX_UNIDADES_COMPRA = 1_000_000
+
+# Límites del barrido de precios (evitan peticiones enormes): el barrido crea
+# varios arrays de precios x partidas x días, así que también se limita su tamaño
+MAX_PARTIDAS_BARRIDO = 10000
+MAX_PRECIOS_BARRIDO = 50
+MAX_DIAS_BARRIDO = 365
+MAX_CELDAS_BARRIDO = 2_000_000  # precios * partidas * días (unos 16 MB por array)
+MAX_PRODUCCION_BARRIDO = 1000    # vasos al día; la demanda diaria nunca pasa de 131
+
+# Límite de operaciones por lote (el lock se mantiene durante todo el lote)
+MAX_OPERACIONES_LOTE = 100
+
 # ---------------------- DATACLASS PARA EL ESTADO ----------------------
-@dataclass
+@dataclass(slots=True)
 class EstadoFinanciero:
     """
     Guarda el estado interno del juego; es la "fuente de la verdad".
@@ -87,12 +160,33 @@ class EstadoFinanciero:
     # Parámetros adicionales: nivel de inversión en calidad (mejora la demanda)
     nivel_calidad: int = 0  # 0 = normal, +1 +2 etc. (por compra de mejoras - opcional)
 
-    # Registro histórico simple (lista de dict por día)
-    historial: list = None
+    # Registro histórico simple (dict por día); sólo se guardan los últimos HISTORIAL_MAX días
+    historial: deque = field(default_factory=lambda: deque(maxlen=HISTORIAL_MAX))
 
-    def __post_init__(self):
-        if self.historial is None:
-            self.historial = []
+# ---------------------- CÁLCULO DE LA DEMANDA ----------------------
+@njit(cache=True)
+def _demanda_desde_parametros(base: int, precio: float, coste_base: float,
+                              nivel_calidad: int, ruido: int) -> int:
+    """
+    Demanda del día a partir de la demanda base, el precio, la calidad y el ruido.
+    Sin estado ni aleatoriedad para que numba (si está instalado) la compile.
+    """
+    # penalización por precio relativo al coste (si el precio es muy alto, baja demanda;
+    # si es bajo, sube un poco): el tramo es el número de umbrales superados, sin
+    # cadena de if ni np.searchsorted (que en Python puro es más lento que los if)
+    ratio = precio / (coste_base + 1e-6)
+    tramo = ((ratio > UMBRAL_PRECIO_1) + (ratio > UMBRAL_PRECIO_2)
+             + (ratio > UMBRAL_PRECIO_3) + (ratio > UMBRAL_PRECIO_4))
+    demanda = int(base * FACTORES_PRECIO_T[tramo])
+
+    # efecto de la calidad (marketing / inversiones) y ruido aleatorio pequeño
+    demanda += nivel_calidad * 8 + ruido
+    return demanda if demanda > 0 else 0
+
+if NUMBA_DISPONIBLE:
+    # compilar al importar (mismos tipos que en _calcular_demanda: int, float, float, int, int);
+    # si no, la primera simulación pagaría la compilación con el lock tomado
+    _demanda_desde_parametros(0, 1.0, COSTE_POR_VASO, 0, 0)
 
 # ---------------------- CLASE PRINCIPAL DEL JUEGO ----------------------
 class LemonadeGame:
@@ -110,26 +204,32 @@ class LemonadeGame:
         )
         # bloquear redeploy / concurrencia básica (simple)
         self.lock = threading.Lock()
+        # generador aleatorio propio de la partida (no comparte estado con el módulo random)
+        self._rng = random.Random()
+        # estado público ya serializado (bytes JSON); None = hay que regenerarlo
+        self._estado_json = None
         # generar clima inicial
         self._generar_clima()
 
     # ---------------------- UTILIDADES ----------------------
-    def _precio_ingredientes_por_vaso(self) -> float:
-        """Devuelve el coste de ingredientes para 1 vaso (suma)."""
-        return COSTE_LIMON * INGREDIENTES_POR_VASO["limon"] + \
-               COSTE_AZUCAR * INGREDIENTES_POR_VASO["azucar"] + \
-               COSTE_VASO * INGREDIENTES_POR_VASO["vaso"]
+    def _invalidar_cache(self):
+        """Descarta el estado público serializado; llamar (con el lock) tras cada cambio."""
+        self._estado_json = None
+
+    def _guardar_estado_publico(self) -> dict:
+        """
+        Calcula el estado público y deja guardada su serialización (llamar con el
+        lock), para que el siguiente /api/state no lo vuelva a construir.
+        """
+        estado = self.get_estado_publico()
+        self._estado_json = orjson.dumps(estado, option=OPCIONES_ORJSON)
+        return estado
 
     def _generar_clima(self):
         """Genera un clima simple que afecta a la demanda: Caluroso/Templado/Frío."""
-        self.clima = random.choices(["Caluroso", "Templado", "Frío"], weights=[0.35, 0.50, 0.15])[0]
+        self.clima = CLIMAS[bisect(PROB_CLIMAS_ACUM, self._rng.random())]
         # demanda base según clima (clientes potenciales)
-        if self.clima == "Caluroso":
-            self.demanda_base = random.randint(60, 110)
-        elif self.clima == "Templado":
-            self.demanda_base = random.randint(30, 70)
-        else:
-            self.demanda_base = random.randint(5, 35)
+        self.demanda_base = self._rng.randint(*DEMANDA_BASE_CLIMA[self.clima])
 
     # ---------------------- ACCIONES DEL JUGADOR ----------------------
     def comprar_ingredientes(self, limones: int = 0, azucar: int = 0, vasos: int = 0) -> dict:
@@ -138,38 +238,50 @@ class LemonadeGame:
         Devuelve dict con resultado y mensaje.
         """
         with self.lock:
-            limones = max(0, int(limones))
-            azucar = max(0, int(azucar))
-            vasos = max(0, int(vasos))
-            coste_total = limones * COSTE_LIMON + azucar * COSTE_AZUCAR + vasos * COSTE_VASO
-
-            if coste_total > self.estado.caja + 1e-9:
-                return {"ok": False, "mensaje": "No hay suficiente caja para esa compra."}
-
-            # Pago inmediato (flujo de caja)
-            self.estado.caja -= coste_total
-            self.estado.pagos_acumulados += coste_total
-            # Aumenta inventarios físicos
-            self.estado.inventario_limones += limones
-            self.estado.inventario_azucar += azucar
-            self.estado.inventario_vasos += vasos
-
-            mensaje = f"Compraste {limones} limones, {azucar} azúcar, {vasos} vasos. Gastaste {coste_total:.2f} €."
-            # registrar gasto operativo si quieres (aquí lo consideramos compra, no gasto operativo)
-            # devolvemos también el estado de caja
-            return {"ok": True, "mensaje": mensaje, "coste": round(coste_total,2), "caja": round(self.estado.caja,2)}
+            return self._comprar_ingredientes(limones, azucar, vasos)
+
+    def _comprar_ingredientes(self, limones: int = 0, azucar: int = 0, vasos: int = 0) -> dict:
+        """Igual que comprar_ingredientes, pero sin tomar el lock (el llamador ya lo tiene)."""
+        limones = max(0, int(limones))
+        azucar = max(0, int(azucar))
+        vasos = max(0, int(vasos))
+        if max(limones, azucar, vasos) > MAX_UNIDADES_COMPRA:
+            return {"ok": False, "mensaje": f"Como máximo {MAX_UNIDADES_COMPRA} unidades de cada ingrediente por compra."}
+        coste_total = limones * COSTE_LIMON + azucar * COSTE_AZUCAR + vasos * COSTE_VASO
+
+        if coste_total > self.estado.caja + 1e-9:
+            return {"ok": False, "mensaje": "No hay suficiente caja para esa compra."}
+
+        # Pago inmediato (flujo de caja)
+        self.estado.caja -= coste_total
+        self.estado.pagos_acumulados += coste_total
+        # Aumenta inventarios físicos
+        self.estado.inventario_limones += limones
+        self.estado.inventario_azucar += azucar
+        self.estado.inventario_vasos += vasos
+
+        mensaje = f"Compraste {limones} limones, {azucar} azúcar, {vasos} vasos. Gastaste {coste_total:.2f} €."
+        # registrar gasto operativo si quieres (aquí lo consideramos compra, no gasto operativo)
+        # devolvemos también el estado de caja
+        self._invalidar_cache()
+        return {"ok": True, "mensaje": mensaje, "coste": round(coste_total,2), "caja": round(self.estado.caja,2)}
 
     def fijar_precio(self, precio: float) -> dict:
         """Fija el precio de venta por vaso."""
         with self.lock:
-            try:
-                p = float(precio)
-                if p <= 0:
-                    return {"ok": False, "mensaje": "El precio debe ser mayor que 0."}
-                self.estado.precio_venta = round(p, 2)
-                return {"ok": True, "mensaje": f"Precio fijado a {self.estado.precio_venta:.2f} €."}
-            except Exception:
-                return {"ok": False, "mensaje": "Precio inválido."}
+            return self._fijar_precio(precio)
+
+    def _fijar_precio(self, precio: float) -> dict:
+        """Igual que fijar_precio, pero sin tomar el lock (el llamador ya lo tiene)."""
+        try:
+            p = float(precio)
+            if not 0 < p <= MAX_PRECIO:  # también descarta nan e inf
+                return {"ok": False, "mensaje": f"El precio debe ser mayor que 0 y como máximo {MAX_PRECIO:.2f} €."}
+            self.estado.precio_venta = round(p, 2)
+            self._invalidar_cache()
+            return {"ok": True, "mensaje": f"Precio fijado a {self.estado.precio_venta:.2f} €."}
+        except Exception:
+            return {"ok": False, "mensaje": "Precio inválido."}
 
     def producir(self, cantidad: int) -> dict:
         """
@@ -180,33 +292,37 @@ class LemonadeGame:
         Se ACUMULA si se llama varias veces el mismo día.
         """
         with self.lock:
-            cantidad = max(0, int(cantidad))
-            # máxima producción posible según ingredientes disponibles
-            max_posible = min(
-                self.estado.inventario_limones // INGREDIENTES_POR_VASO["limon"],
-                self.estado.inventario_azucar // INGREDIENTES_POR_VASO["azucar"],
-                self.estado.inventario_vasos // INGREDIENTES_POR_VASO["vaso"]
-            )
-            a_producir = min(cantidad, max_posible)
-            if a_producir <= 0:
-                return {"ok": False, "mensaje": "No hay ingredientes suficientes para producir."}
-
-            # consumir ingredientes
-            self.estado.inventario_limones -= a_producir * INGREDIENTES_POR_VASO["limon"]
-            self.estado.inventario_azucar -= a_producir * INGREDIENTES_POR_VASO["azucar"]
-            self.estado.inventario_vasos -= a_producir * INGREDIENTES_POR_VASO["vaso"]
-
-            # aumentar inventario de limonada preparada
-            coste_unitario = self._precio_ingredientes_por_vaso()
-            coste_total_nueva = coste_unitario * a_producir
-            self.estado.inventario_limonada += a_producir
-            self.estado.coste_inventario_limonada += coste_total_nueva
-
-            # producidas hoy (acumulativo)
-            self.estado.producidas_hoy += a_producir
-
-            mensaje = f"Producidas {a_producir} unidades. Coste añadido {coste_total_nueva:.2f} €."
-            return {"ok": True, "mensaje": mensaje, "producidas_hoy": self.estado.producidas_hoy}
+            return self._producir(cantidad)
+
+    def _producir(self, cantidad: int) -> dict:
+        """Igual que producir, pero sin tomar el lock (el llamador ya lo tiene)."""
+        cantidad = max(0, int(cantidad))
+        # máxima producción posible según ingredientes disponibles
+        max_posible = min(
+            self.estado.inventario_limones // INGR_LIMON,
+            self.estado.inventario_azucar // INGR_AZUCAR,
+            self.estado.inventario_vasos // INGR_VASO
+        )
+        a_producir = min(cantidad, max_posible)
+        if a_producir <= 0:
+            return {"ok": False, "mensaje": "No hay ingredientes suficientes para producir."}
+
+        # consumir ingredientes
+        self.estado.inventario_limones -= a_producir * INGR_LIMON
+        self.estado.inventario_azucar -= a_producir * INGR_AZUCAR
+        self.estado.inventario_vasos -= a_producir * INGR_VASO
+
+        # aumentar inventario de limonada preparada
+        coste_total_nueva = COSTE_POR_VASO * a_producir
+        self.estado.inventario_limonada += a_producir
+        self.estado.coste_inventario_limonada += coste_total_nueva
+
+        # producidas hoy (acumulativo)
+        self.estado.producidas_hoy += a_producir
+
+        mensaje = f"Producidas {a_producir} unidades. Coste añadido {coste_total_nueva:.2f} €."
+        self._invalidar_cache()
+        return {"ok": True, "mensaje": mensaje, "producidas_hoy": self.estado.producidas_hoy}
 
     def campaña_publicidad(self, gasto: float) -> dict:
         """
@@ -214,17 +330,22 @@ class LemonadeGame:
         Esta función es un ejemplo de gasto operativo.
         """
         with self.lock:
-            gasto = max(0.0, float(gasto))
-            if gasto > self.estado.caja + 1e-9:
-                return {"ok": False, "mensaje": "No hay caja suficiente para la campaña."}
-            self.estado.caja -= gasto
-            self.estado.pagos_acumulados += gasto
-            self.estado.gastos_operativos_acumulado += gasto
-            # traducimos gasto en publicidad a aumento de 'nivel_calidad' temporal
-            aumento = int(gasto // COSTE_PUBLICIDAD_BASE)
-            self.estado.nivel_calidad += aumento
-            mensaje = f"Campaña realizada. Gasto {gasto:.2f} €. Aumento de visibilidad: +{aumento}."
-            return {"ok": True, "mensaje": mensaje}
+            return self._campaña_publicidad(gasto)
+
+    def _campaña_publicidad(self, gasto: float) -> dict:
+        """Igual que campaña_publicidad, pero sin tomar el lock (el llamador ya lo tiene)."""
+        gasto = max(0.0, float(gasto))
+        if gasto > self.estado.caja + 1e-9:
+            return {"ok": False, "mensaje": "No hay caja suficiente para la campaña."}
+        self.estado.caja -= gasto
+        self.estado.pagos_acumulados += gasto
+        self.estado.gastos_operativos_acumulado += gasto
+        # traducimos gasto en publicidad a aumento de 'nivel_calidad' temporal
+        aumento = int(gasto // COSTE_PUBLICIDAD_BASE)
+        self.estado.nivel_calidad = min(MAX_NIVEL_CALIDAD, self.estado.nivel_calidad + aumento)
+        mensaje = f"Campaña realizada. Gasto {gasto:.2f} €. Aumento de visibilidad: +{aumento}."
+        self._invalidar_cache()
+        return {"ok": True, "mensaje": mensaje}
 
     # ---------------------- SIMULACIÓN DEL DÍA ----------------------
     def _calcular_demanda(self) -> int:
@@ -234,31 +355,12 @@ class LemonadeGame:
          - sensibilidad al precio (precios altos reducen demanda)
          - efecto de la calidad/marketing (nivel_calidad)
         """
-        precio = self.estado.precio_venta
-        demanda = self.demanda_base
-
-        # penalización por precio relativo al coste (si el precio es muy alto, baja demanda)
-        coste_base = self._precio_ingredientes_por_vaso()
-        # sensibilidad simple: cuanto mayor sea ratio precio/coste, mayor probabilidad de reducir demanda
-        ratio = precio / (coste_base + 1e-6)
-        if ratio > 3.0:
-            demanda = int(demanda * 0.3)
-        elif ratio > 2.0:
-            demanda = int(demanda * 0.6)
-        elif ratio > 1.5:
-            demanda = int(demanda * 0.8)
-        # precio bajo puede aumentar un poco la demanda
-        elif ratio < 0.8:
-            demanda = int(demanda * 1.15)
-
-        # efecto de la calidad (marketing / inversiones)
-        demanda += self.estado.nivel_calidad * 8
-
-        # ruido aleatorio pequeño
-        demanda = max(0, int(demanda + random.randint(-5, 5)))
-        return demanda
-
-    def simular_dia(self, gastar_publicidad: float = 0.0) -> dict:
+        # ruido aleatorio pequeño (se sortea aquí; el cálculo va en una función compilable)
+        ruido = self._rng.randint(-5, 5)
+        return _demanda_desde_parametros(self.demanda_base, self.estado.precio_venta,
+                                         COSTE_POR_VASO, self.estado.nivel_calidad, ruido)
+
+    def simular_dia(self, gastar_publicidad: float = 0.0, incluir_estado: bool = False) -> dict:
         """
         Simula el día:
          - opcionalmente se puede gastar en publicidad antes de las ventas
@@ -266,196 +368,298 @@ class LemonadeGame:
          - actualiza caja (cobros) y contabilidad acumulada
          - vacía producidas_hoy (pero inventario_limonada se reduce según ventas)
          - genera resumen del día para mostrar en UI
+        Con incluir_estado=True devuelve además el estado público, calculado dentro
+        del mismo lock: {"ok", "resultado_simulacion", "estado"}.
         """
         with self.lock:
-            # aplicar publicidad si se pide
-            if gastar_publicidad and gastar_publicidad > 0:
-                pub = self.campaña_publicidad(gastar_publicidad)
-                # la campaña_publicidad ya actualiza caja y gastos_operativos
-
-            # calcular demanda y ventas
-            demanda = self._calcular_demanda()
-            ventas_posibles = min(self.estado.inventario_limonada, demanda)
-            unidades_vendidas = ventas_posibles
-
-            ingresos = unidades_vendidas * self.estado.precio_venta
-
-            # coste de ventas: calculamos coste por unidad de limonada en inventario (media ponderada)
-            coste_total_inventario = self.estado.coste_inventario_limonada
-            inventario_total = self.estado.inventario_limonada
-            coste_por_unidad = 0.0
+            res = self._simular_dia(gastar_publicidad)
+            if not incluir_estado:
+                return res
+            return {"ok": True, "resultado_simulacion": res, "estado": self._guardar_estado_publico()}
+
+    def _simular_dia(self, gastar_publicidad: float = 0.0) -> dict:
+        """
+        Igual que simular_dia, pero sin tomar el lock (el llamador ya lo tiene).
+        Precio y nivel_calidad están acotados, así que el cálculo de la demanda no
+        puede fallar a mitad del día con la publicidad ya cobrada.
+        """
+        # aplicar publicidad si se pide
+        if gastar_publicidad and gastar_publicidad > 0:
+            # ya tenemos el lock: usamos la versión interna (el Lock no es reentrante)
+            self._campaña_publicidad(gastar_publicidad)
+            # la campaña_publicidad ya actualiza caja y gastos_operativos
+
+        # calcular demanda y ventas
+        demanda = self._calcular_demanda()
+        ventas_posibles = min(self.estado.inventario_limonada, demanda)
+        unidades_vendidas = ventas_posibles
+
+        ingresos = unidades_vendidas * self.estado.precio_venta
+
+        # coste de ventas: calculamos coste por unidad de limonada en inventario (media ponderada)
+        coste_total_inventario = self.estado.coste_inventario_limonada
+        inventario_total = self.estado.inventario_limonada
+        coste_por_unidad = 0.0
+        coste_ventas = 0.0
+        if inventario_total > 0:
+            # si vendemos N, restamos proporcionalmente del coste del inventario
+            coste_por_unidad = coste_total_inventario / inventario_total
+            coste_ventas = coste_por_unidad * unidades_vendidas
+        else:
             coste_ventas = 0.0
-            if inventario_total > 0:
-                # si vendemos N, restamos proporcionalmente del coste del inventario
-                coste_por_unidad = coste_total_inventario / inventario_total
-                coste_ventas = coste_por_unidad * unidades_vendidas
-            else:
-                coste_ventas = 0.0
-
-            # actualizar inventario físico y coste del inventario remanente
-            self.estado.inventario_limonada -= unidades_vendidas
-            # reducimos el coste acumulado proporcionalmente
-            self.estado.coste_inventario_limonada -= coste_ventas
-            # evitar negativos por redondeo
-            self.estado.coste_inventario_limonada = max(0.0, round(self.estado.coste_inventario_limonada, 4))
-
-            # actualizar caja y flujos
-            self.estado.caja += ingresos
-            self.estado.cobros_acumulados += ingresos
-
-            # actualizar cuenta de resultados acumulada
-            self.estado.ingresos_acumulados += ingresos
-            self.estado.coste_ventas_acumulado += coste_ventas
-
-            # gastos operativos (ya actualizados vía campaña_publicidad si se usó)
-            gasto_operativo_hoy = 0.0  # por ahora no hay otros gastos diarios automáticos
-            self.estado.gastos_operativos_acumulado += gasto_operativo_hoy
-
-            # beneficio del día (simplificado)
-            beneficio_dia = ingresos - coste_ventas - gasto_operativo_hoy
-
-            # actualizar beneficios acumulados y patrimonio
-            self.estado.beneficios_acumulados += beneficio_dia
-
-            # registro del día (historial)
-            resumen = {
-                "dia": self.estado.dia,
-                "clima": self.clima,
-                "demanda": demanda,
-                "vendido": unidades_vendidas,
-                "ingresos": round(ingresos,2),
-                "coste_ventas": round(coste_ventas,2),
-                "beneficio_dia": round(beneficio_dia,2),
-                "caja": round(self.estado.caja,2)
-            }
-            self.estado.historial.append(resumen)
-
-            # texto resumen para UI
-            texto_resumen = (
-                f"Día {self.estado.dia}: clima {self.clima}. "
-                f"Demanda estimada {demanda}. Vendiste {unidades_vendidas} vasos. "
-                f"Ingresos {ingresos:.2f} €. Coste ventas {coste_ventas:.2f} €. "
-                f"Caja final {self.estado.caja:.2f} €."
-            )
-            self.estado.resumen_ultimo_dia = texto_resumen
-
-            # preparar siguiente día
-            self.estado.dia += 1
-            self.estado.producidas_hoy = 0
-            # regenerar clima para el día siguiente (si no se ha acabado)
-            if self.estado.dia <= self.estado.dias_totales:
-                self._generar_clima()
-
-            # devolver resumen del día
-            return {"ok": True, "resumen": resumen, "mensaje": texto_resumen}
 
-    # ---------------------- CÁLCULOS CONTABLES PARA FRONTEND ----------------------
-    def calcular_balance(self) -> dict:
+        # actualizar inventario físico y coste del inventario remanente
+        self.estado.inventario_limonada -= unidades_vendidas
+        # reducimos el coste acumulado proporcionalmente
+        self.estado.coste_inventario_limonada -= coste_ventas
+        # evitar negativos por redondeo
+        self.estado.coste_inventario_limonada = max(0.0, round(self.estado.coste_inventario_limonada, 4))
+
+        # actualizar caja y flujos
+        self.estado.caja += ingresos
+        self.estado.cobros_acumulados += ingresos
+
+        # actualizar cuenta de resultados acumulada
+        self.estado.ingresos_acumulados += ingresos
+        self.estado.coste_ventas_acumulado += coste_ventas
+
+        # gastos operativos (ya actualizados vía campaña_publicidad si se usó)
+        gasto_operativo_hoy = 0.0  # por ahora no hay otros gastos diarios automáticos
+        self.estado.gastos_operativos_acumulado += gasto_operativo_hoy
+
+        # beneficio del día (simplificado)
+        beneficio_dia = ingresos - coste_ventas - gasto_operativo_hoy
+
+        # actualizar beneficios acumulados y patrimonio
+        self.estado.beneficios_acumulados += beneficio_dia
+
+        # registro del día (historial)
+        resumen = {
+            "dia": self.estado.dia,
+            "clima": self.clima,
+            "demanda": demanda,
+            "vendido": unidades_vendidas,
+            "ingresos": round(ingresos,2),
+            "coste_ventas": round(coste_ventas,2),
+            "beneficio_dia": round(beneficio_dia,2),
+            "caja": round(self.estado.caja,2)
+        }
+        self.estado.historial.append(resumen)
+
+        # texto resumen para UI
+        texto_resumen = (
+            f"Día {self.estado.dia}: clima {self.clima}. "
+            f"Demanda estimada {demanda}. Vendiste {unidades_vendidas} vasos. "
+            f"Ingresos {ingresos:.2f} €. Coste ventas {coste_ventas:.2f} €. "
+            f"Caja final {self.estado.caja:.2f} €."
+        )
+        self.estado.resumen_ultimo_dia = texto_resumen
+
+        # preparar siguiente día
+        self.estado.dia += 1
+        self.estado.producidas_hoy = 0
+        # regenerar clima para el día siguiente (si no se ha acabado)
+        if self.estado.dia <= self.estado.dias_totales:
+            self._generar_clima()
+        self._invalidar_cache()
+
+        # devolver resumen del día
+        return {"ok": True, "resumen": resumen, "mensaje": texto_resumen}
+
+    # ---------------------- ACCIONES EN LOTE ----------------------
+    def ejecutar_lote(self, operaciones: list) -> dict:
         """
-        Calcula un balance simplificado:
-         ACTIVO:
-           - caja (efectivo)
-           - existencias: valor de ingredientes + valor de limonada preparada
-           - inmovilizado: (0 por ahora)
-         PASIVO:
-           - deuda
-         PATRIMONIO NETO:
-           - capital inicial + beneficios acumulados - deuda
+        Ejecuta varias acciones seguidas tomando el lock una sola vez, p. ej.:
+          [{"op": "buy", "args": {"limones": 10, "azucar": 10, "vasos": 10}},
+           {"op": "produce", "args": {"cantidad": 10}},
+           {"op": "simulate"}]
+        Ninguna otra petición se intercala entre ellas. Los "args" son los mismos
+        que reciben los endpoints /api/buy, /api/produce, /api/set_price y /api/simulate.
+        Devuelve el resultado de cada operación y el estado público final.
         """
-        # valor existencias ingredientes
-        valor_limones = self.estado.inventario_limones * COSTE_LIMON
-        valor_azucar = self.estado.inventario_azucar * COSTE_AZUCAR
-        valor_vasos = self.estado.inventario_vasos * COSTE_VASO
-        valor_ingredientes = valor_limones + valor_azucar + valor_vasos
+        with self.lock:
+            resultados = [self._ejecutar_operacion(operacion) for operacion in operaciones]
+            return {"ok": True, "resultados": resultados, "estado": self._guardar_estado_publico()}
+
+    def _ejecutar_operacion(self, operacion) -> dict:
+        """Ejecuta una operación del lote (el llamador ya tiene el lock)."""
+        if not isinstance(operacion, dict) or not isinstance(operacion.get("args", {}), dict):
+            return {"ok": False, "mensaje": "Operación inválida."}
+        op = operacion.get("op")
+        args = operacion.get("args", {})
+        try:
+            if op == "buy":
+                return self._comprar_ingredientes(args.get("limones", 0), args.get("azucar", 0), args.get("vasos", 0))
+            if op == "produce":
+                return self._producir(args.get("cantidad", 0))
+            if op == "set_price":
+                return self._fijar_precio(args.get("precio", self.estado.precio_venta))
+            if op == "simulate":
+                return self._simular_dia(float(args.get("gasto_publicidad", 0.0)))
+        except (TypeError, ValueError):
+            return {"ok": False, "mensaje": "Argumentos inválidos."}
+        return {"ok": False, "mensaje": f"Operación desconocida: {op}."}
+
+    # ---------------------- SIMULACIÓN EN LOTE (ANÁLISIS "¿QUÉ PASARÍA SI...?") ----------------------
+    @staticmethod
+    def simular_barrido(precios, n_partidas: int = 1000, dias: int = DIAS_TOTALES,
+                        produccion_diaria: int = None, semilla: int = None) -> dict:
+        """
+        Simula muchas partidas para cada precio de 'precios' con NumPy, sin tocar
+        el juego en curso. Sirve para estudiar la sensibilidad del beneficio al precio.
+         - cada partida sortea clima, demanda base y ruido igual que simular_dia
+         - todos los precios comparten los mismos sorteos (comparación justa)
+         - si produccion_diaria es None se produce justo lo que se demanda;
+           si no, se producen esas unidades cada día y lo no vendido se acumula
+           (entero entre 0 y MAX_PRODUCCION_BARRIDO; lo valida /api/sweep)
+        Devuelve, para cada precio, beneficio medio / percentiles y ventas medias.
+        El beneficio es el contable (ingresos - coste de ventas): lo producido y no
+        vendido queda como existencias, igual que en la partida normal.
+        """
+        rng = np.random.Generator(np.random.PCG64(semilla))
+        precios = np.asarray(precios, dtype=float)
 
-        # valor limonada preparada = coste_inventario_limonada
-        valor_limonada_preparada = round(self.estado.coste_inventario_limonada, 2)
+        # sorteos comunes (n_partidas x dias)
+        idx_clima = rng.choice(len(CLIMAS), size=(n_partidas, dias), p=PROB_CLIMAS)
+        rangos = np.array([DEMANDA_BASE_CLIMA[c] for c in CLIMAS])
+        demanda_base = rng.integers(rangos[idx_clima, 0], rangos[idx_clima, 1], endpoint=True)
+        ruido = rng.integers(-5, 5, size=(n_partidas, dias), endpoint=True)
 
-        activo = {
-            "caja": round(self.estado.caja, 2),
-            "existencias_ingredientes": round(valor_ingredientes, 2),
-            "existencias_limonada": valor_limonada_preparada,
-            "inmovilizado": 0.0
-        }
-        total_activo = round(sum(activo.values()), 2)
-        pasivo = {
-            "deuda": round(self.estado.deuda, 2)
-        }
-        patrimonio = {
-            "capital_inicial": round(self.estado.capital_inicial, 2),
-            "beneficios_acumulados": round(self.estado.beneficios_acumulados, 2)
-        }
-        total_pasivo_patrimonio = round(pasivo["deuda"] + patrimonio["capital_inicial"] + patrimonio["beneficios_acumulados"], 2)
+        # penalización por precio (misma escala que _calcular_demanda), un factor por precio
+        ratio = precios / (COSTE_POR_VASO + 1e-6)
+        factor = FACTORES_PRECIO[np.searchsorted(UMBRALES_PRECIO, ratio)]
+
+        # demanda (precios x partidas x dias); int() de Python trunca igual que floor para >= 0
+        demanda = np.floor(demanda_base * factor[:, None, None]).astype(np.int64)
+        demanda = np.maximum(0, demanda + ruido)
+
+        if produccion_diaria is None:
+            ventas = demanda.sum(axis=2)
+        else:
+            inventario = np.zeros(demanda.shape[:2], dtype=np.int64)
+            ventas = np.zeros_like(inventario)
+            for dia in range(dias):
+                inventario += produccion_diaria
+                vendidas = np.minimum(inventario, demanda[:, :, dia])
+                inventario -= vendidas
+                ventas += vendidas
+
+        beneficio = ventas * (precios[:, None] - COSTE_POR_VASO)
         return {
-            "activo": activo,
-            "total_activo": total_activo,
-            "pasivo": pasivo,
-            "patrimonio": patrimonio,
-            "total_pasivo_patrimonio": total_pasivo_patrimonio,
-            "explicacion_activo": "El ACTIVO muestra lo que tiene la empresa (caja y existencias).",
-            "explicacion_pasivo": "El PASIVO y PATRIMONIO muestran cómo se ha financiado (deudas y aportaciones/beneficios)."
+            "precios": precios,
+            "partidas": n_partidas,
+            "dias": dias,
+            "ventas_medias": ventas.mean(axis=1),
+            "beneficio_medio": beneficio.mean(axis=1),
+            "beneficio_p10": np.percentile(beneficio, 10, axis=1),
+            "beneficio_p90": np.percentile(beneficio, 90, axis=1)
         }
 
-    def calcular_cuenta_resultados(self) -> dict:
+    # ---------------------- CÁLCULOS CONTABLES PARA FRONTEND ----------------------
+    def get_estado_publico(self) -> dict:
         """
-        Devuelve la cuenta de resultados acumulada (ingresos y gastos).
+        Devuelve todo lo necesario para el frontend:
+        - estado básico (dia, inventarios, caja, precio)
+        - estados financieros calculados (balance, cuenta de resultados, flujo de efectivo)
+        - resumen del último día y el historial
+        Los importes van sin redondear: el frontend los muestra con 2 decimales.
+        Los textos explicativos no se incluyen (ver EXPLICACIONES y /api/explanations).
+
+        Los tres estados financieros se calculan en una sola pasada, leyendo cada
+        campo de self.estado una única vez en variables locales.
+
+        No toma el lock porque el llamador ya lo tiene: se llama siempre con
+        self.lock tomado (estado_publico_json al regenerar la caché, reset,
+        simular_dia con incluir_estado y ejecutar_lote). Las consultas frecuentes
+        del frontend no llegan aquí: leen los bytes cacheados sin lock.
         """
-        ingresos = round(self.estado.ingresos_acumulados, 2)
-        coste_ventas = round(self.estado.coste_ventas_acumulado, 2)
-        gastos = round(self.estado.gastos_operativos_acumulado, 2)
-        beneficio = round(ingresos - coste_ventas - gastos, 2)
-        return {
+        st = self.estado  # referencia local: un solo acceso al atributo por campo
+        caja = st.caja
+        inventario_limones = st.inventario_limones
+        inventario_azucar = st.inventario_azucar
+        inventario_vasos = st.inventario_vasos
+        deuda = st.deuda
+        capital_inicial = st.capital_inicial
+        beneficios_acumulados = st.beneficios_acumulados
+        ingresos = st.ingresos_acumulados
+        coste_ventas = st.coste_ventas_acumulado
+        gastos = st.gastos_operativos_acumulado
+
+        # BALANCE simplificado:
+        #  ACTIVO: caja + existencias (ingredientes + limonada preparada) + inmovilizado (0 por ahora)
+        #  PASIVO: deuda
+        #  PATRIMONIO NETO: capital inicial + beneficios acumulados
+        valor_ingredientes = (inventario_limones * COSTE_LIMON + inventario_azucar * COSTE_AZUCAR
+                              + inventario_vasos * COSTE_VASO)
+        # valor limonada preparada = coste_inventario_limonada
+        valor_limonada_preparada = st.coste_inventario_limonada
+        balance = {
+            "activo": {
+                "caja": caja,
+                "existencias_ingredientes": valor_ingredientes,
+                "existencias_limonada": valor_limonada_preparada,
+                "inmovilizado": 0.0
+            },
+            "total_activo": caja + valor_ingredientes + valor_limonada_preparada,
+            "pasivo": {
+                "deuda": deuda
+            },
+            "patrimonio": {
+                "capital_inicial": capital_inicial,
+                "beneficios_acumulados": beneficios_acumulados
+            },
+            "total_pasivo_patrimonio": deuda + capital_inicial + beneficios_acumulados
+        }
+
+        # CUENTA DE RESULTADOS acumulada (ingresos y gastos)
+        cuenta = {
             "ingresos": ingresos,
             "coste_ventas": coste_ventas,
             "gastos_operativos": gastos,
-            "beneficio": beneficio,
-            "explicacion": "Aquí ves cuánto has vendido (ingresos) y cuánto te ha costado vender (coste de ventas)."
+            "beneficio": ingresos - coste_ventas - gastos
+        }
+
+        # FLUJO DE CAJA simple: cobros menos pagos
+        flujo = {
+            "cobros": st.cobros_acumulados,
+            "pagos": st.pagos_acumulados,
+            "saldo_caja": caja
         }
 
-    def calcular_flujo_efectivo(self) -> dict:
-        """
-        Flujo de caja simple: cobros menos pagos.
-        """
-        cobros = round(self.estado.cobros_acumulados, 2)
-        pagos = round(self.estado.pagos_acumulados, 2)
-        saldo_caja = round(self.estado.caja, 2)
         return {
-            "cobros": cobros,
-            "pagos": pagos,
-            "saldo_caja": saldo_caja,
-            "explicacion": "La caja muestra cuánto dinero tienes ahora mismo (cobros y pagos reales)."
+            "dia": st.dia,
+            "dias_totales": st.dias_totales,
+            "caja": caja,
+            "inventario_limones": inventario_limones,
+            "inventario_azucar": inventario_azucar,
+            "inventario_vasos": inventario_vasos,
+            "inventario_limonada": st.inventario_limonada,
+            "producidas_hoy": st.producidas_hoy,
+            "precio_venta": st.precio_venta,
+            "clima": self.clima,
+            "demanda_base": self.demanda_base,
+            "resumen_ultimo_dia": st.resumen_ultimo_dia,
+            "historial": list(st.historial),  # últimos HISTORIAL_MAX días (copia)
+            "balance": balance,
+            "cuenta_resultados": cuenta,
+            "flujo_efectivo": flujo
         }
 
-    def get_estado_publico(self) -> dict:
+    def estado_publico_json(self) -> bytes:
         """
-        Devuelve todo lo necesario para el frontend:
-        - estado básico (dia, inventarios, caja, precio)
-        - estados financieros calculados (balance, cuenta de resultados, flujo de efectivo)
-        - resumen del último día y el historial
+        get_estado_publico ya serializado con orjson. Se guarda hasta la próxima
+        acción que cambie el estado, así las consultas repetidas no recalculan nada.
         """
-        with self.lock:
-            balance = self.calcular_balance()
-            cuenta = self.calcular_cuenta_resultados()
-            flujo = self.calcular_flujo_efectivo()
-            publico = {
-                "dia": self.estado.dia,
-                "dias_totales": self.estado.dias_totales,
-                "caja": round(self.estado.caja, 2),
-                "inventario_limones": self.estado.inventario_limones,
-                "inventario_azucar": self.estado.inventario_azucar,
-                "inventario_vasos": self.estado.inventario_vasos,
-                "inventario_limonada": self.estado.inventario_limonada,
-                "producidas_hoy": self.estado.producidas_hoy,
-                "precio_venta": round(self.estado.precio_venta, 2),
-                "clima": self.clima,
-                "demanda_base": self.demanda_base,
-                "resumen_ultimo_dia": self.estado.resumen_ultimo_dia,
-                "historial": self.estado.historial[-10:],  # últimos 10 días
-                "balance": balance,
-                "cuenta_resultados": cuenta,
-                "flujo_efectivo": flujo
-            }
-            return publico
+        cache = self._estado_json
+        if cache is None:
+            # sólo al regenerar tomamos el lock: la foto es coherente y ninguna
+            # acción puede invalidar la caché mientras la guardamos
+            with self.lock:
+                cache = self._estado_json
+                if cache is None:
+                    self._guardar_estado_publico()
+                    cache = self._estado_json
+        return cache
 
     def reset(self) -> dict:
         """Reinicia el juego al estado inicial (útil para demos)."""
@@ -463,71 +667,6 @@ class LemonadeGame:
             self.estado = EstadoFinanciero()
             self.estado.caja = self.estado.capital_inicial
             self.estado.resumen_ultimo_dia = "Juego reiniciado. Buenas prácticas: comienza comprando ingredientes."
-            self.estado.historial = []
             self.estado.nivel_calidad = 0
             self._generar_clima()
-            return self.get_estado_publico()
-
-# ---------------------- FLASK: API REST DENTRO DE game.py ----------------------
-app = Flask(__name__, static_folder="static", template_folder="templates")
-juego = LemonadeGame()
-
-@app.route("/")
-def index():
-    # servir index.html desde templates para pruebas locales o Render
-    try:
-        return send_from_directory("templates", "index.html")
-    except Exception:
-        return jsonify({"ok": False, "mensaje": "Falta el frontend. Sube templates/index.html"}), 404
-
-@app.route("/api/state", methods=["GET"])
-def api_state():
-    """Devuelve el estado completo para el frontend."""
-    return jsonify(juego.get_estado_publico())
-
-@app.route("/api/buy", methods=["POST"])
-def api_buy():
-    data = request.get_json() or {}
-    lim = int(data.get("limones", 0))
-    az = int(data.get("azucar", 0))
-    vas = int(data.get("vasos", 0))
-    res = juego.comprar_ingredientes(lim, az, vas)
-    return jsonify(res)
-
-@app.route("/api/produce", methods=["POST"])
-def api_produce():
-    data = request.get_json() or {}
-    qty = int(data.get("cantidad", 0))
-    res = juego.producir(qty)
-    return jsonify(res)
-
-@app.route("/api/set_price", methods=["POST"])
-def api_set_price():
-    data = request.get_json() or {}
-    precio = float(data.get("precio", juego.estado.precio_venta))
-    res = juego.fijar_precio(precio)
-    return jsonify(res)
-
-@app.route("/api/simulate", methods=["POST"])
-def api_simulate():
-    data = request.get_json() or {}
-    gasto_pub = float(data.get("gasto_publicidad", 0.0))
-    res = juego.simular_dia(gasto_pub)
-    # además devolver nuevo estado público
-    estado = juego.get_estado_publico()
-    return jsonify({"ok": True, "resultado_simulacion": res, "estado": estado})
-
-@app.route("/api/reset", methods=["POST"])
-def api_reset():
-    estado = juego.reset()
-    return jsonify({"ok": True, "estado": estado})
-
-# Endpoint para servir estáticos si usas la estructura propuesta
-@app.route("/static/<path:filename>")
-def static_files(filename):
-    return send_from_directory("static", filename)
-
-# ---------------------- EJECUTABLE COMO SERVIDOR ----------------------
-if __name__ == "__main__":
-    # para pruebas locales: python game.py
-    app.run(host="0.0.0.0", port=5000, debug=True)
+            return self._guardar_estado_publico()
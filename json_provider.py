@@ -0,0 +1,35 @@
+"""
+Proveedor JSON basado en orjson para las aplicaciones Flask del juego.
+
+Flask usa por defecto el módulo json de la librería estándar (Python puro).
+orjson está escrito en Rust y serializa los diccionarios anidados del estado
+(balance, historial, cuenta de resultados...) bastante más rápido.
+"""
+
+import orjson
+from flask import Response
+from flask.json.provider import JSONProvider
+
+# Opciones comunes: arrays de numpy y claves no-str (p. ej. int) en los dict
+OPCIONES_ORJSON = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Sustituye a DefaultJSONProvider: jsonify(...) sigue funcionando igual,
+    pero la serialización la hace orjson.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, option=OPCIONES_ORJSON).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def respuesta_json(obj, status: int = 200) -> Response:
+    """
+    Construye directamente la respuesta HTTP con los bytes de orjson,
+    sin pasar por jsonify (útil en los endpoints que se consultan a menudo).
+    """
+    return Response(orjson.dumps(obj, option=OPCIONES_ORJSON), status=status, mimetype="application/json")
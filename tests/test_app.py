@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from app import app
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+# ---------------------- /api/sweep ----------------------
+def test_sweep_ok(client):
+    res = client.post("/api/sweep", json={"precios": [1.0, 1.5], "partidas": 200, "semilla": 1})
+    assert res.status_code == 200
+    barrido = res.json["barrido"]
+    assert barrido["precios"] == [1.0, 1.5] and barrido["partidas"] == 200
+    assert len(barrido["ventas_medias"]) == 2
+    # misma semilla, mismo resultado
+    otra = client.post("/api/sweep", json={"precios": [1.0, 1.5], "partidas": 200, "semilla": 1})
+    assert otra.json["barrido"] == barrido
+
+
+@pytest.mark.parametrize("datos", [
+    {"precios": []},
+    {"precios": [0]},
+    {"precios": ["nan"]},
+    {"precios": ["inf"]},
+    {"precios": [1.0] * 51},
+    {"precios": [1.0], "semilla": -1},
+    {"precios": [1.0], "dias": 10 ** 6},
+    {"precios": [1.0], "partidas": 0},
+    {"precios": [1.0] * 50, "partidas": 10000},
+    {"precios": "abc"},
+    {"precios": "123"},
+    {"precios": [1.0], "produccion_diaria": -1},
+    {"precios": [1.0], "produccion_diaria": 10 ** 30},
+    {"precios": [1.0], "partidas": 10, "produccion_diaria": 2 ** 62},
+])
+def test_sweep_rechaza_parametros_invalidos(client, datos):
+    # json.dumps de la librería estándar: orjson no codifica enteros de más de 64 bits
+    res = client.post("/api/sweep", data=json.dumps(datos), content_type="application/json")
+    assert res.status_code == 400
+
+
+# ---------------------- /api/batch ----------------------
+def test_batch_devuelve_resultados_y_estado(client):
+    client.post("/api/reset", json={})
+    res = client.post("/api/batch", json={"operaciones": [
+        {"op": "buy", "args": {"limones": 4, "azucar": 4, "vasos": 4}},
+        {"op": "produce", "args": {"cantidad": 4}},
+        {"op": "otra"},
+    ]})
+    assert res.status_code == 200
+    assert [r["ok"] for r in res.json["resultados"]] == [True, True, False]
+    assert client.get("/api/state").json["inventario_limonada"] == 4
+
+
+@pytest.mark.parametrize("datos", [{}, {"operaciones": "buy"}, {"operaciones": [{"op": "buy"}] * 101}])
+def test_batch_rechaza_listas_invalidas(client, datos):
+    assert client.post("/api/batch", json=datos).status_code == 400
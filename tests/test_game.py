@@ -0,0 +1,154 @@
+import orjson
+import pytest
+
+from game import (COSTE_AZUCAR, COSTE_LIMON, COSTE_POR_VASO, COSTE_VASO, MAX_NIVEL_CALIDAD,
+                  MAX_UNIDADES_COMPRA, LemonadeGame)
+
+
+# ---------------------- BARRIDO DE PRECIOS ----------------------
+def test_barrido_reproducible_con_semilla():
+    res = LemonadeGame.simular_barrido([1.0, 1.5], n_partidas=200, dias=7, semilla=1)
+    otra = LemonadeGame.simular_barrido([1.0, 1.5], n_partidas=200, dias=7, semilla=1)
+    for clave in ("ventas_medias", "beneficio_medio"):
+        assert res[clave].tolist() == otra[clave].tolist()
+    # un precio más alto nunca vende más con los mismos sorteos
+    assert res["ventas_medias"][1] <= res["ventas_medias"][0]
+
+
+def test_barrido_beneficio_es_ventas_por_margen():
+    precios = [0.5, 1.0, 2.5]
+    res = LemonadeGame.simular_barrido(precios, n_partidas=50, semilla=3)
+    for precio, ventas, beneficio in zip(precios, res["ventas_medias"], res["beneficio_medio"]):
+        assert beneficio == pytest.approx(ventas * (precio - COSTE_POR_VASO))
+
+
+def test_barrido_con_produccion_diaria():
+    libre = LemonadeGame.simular_barrido([1.0, 1.5], n_partidas=200, dias=7, semilla=1)
+    res = LemonadeGame.simular_barrido([1.0, 1.5], n_partidas=200, dias=7, produccion_diaria=30, semilla=1)
+    # nunca se vende más de lo producido ni más de lo que se vendería sin límite
+    assert (res["ventas_medias"] <= 30 * 7).all()
+    assert (res["ventas_medias"] <= libre["ventas_medias"]).all()
+
+    sin_produccion = LemonadeGame.simular_barrido([1.0], n_partidas=20, produccion_diaria=0, semilla=1)
+    assert sin_produccion["ventas_medias"].tolist() == [0.0]
+    assert sin_produccion["beneficio_medio"].tolist() == [0.0]
+
+
+# ---------------------- ACCIONES EN LOTE ----------------------
+@pytest.fixture
+def juego():
+    partida = LemonadeGame()
+    partida._rng.seed(5)
+    partida.reset()
+    return partida
+
+
+def test_lote_ejecuta_las_operaciones_en_orden(juego):
+    res = juego.ejecutar_lote([
+        {"op": "buy", "args": {"limones": 10, "azucar": 10, "vasos": 10}},
+        {"op": "produce", "args": {"cantidad": 8}},
+        {"op": "set_price", "args": {"precio": 1.2}},
+        {"op": "simulate"},
+    ])
+    assert [r["ok"] for r in res["resultados"]] == [True, True, True, True]
+    assert res["estado"]["dia"] == 2
+    assert res["estado"]["precio_venta"] == 1.2
+    assert res["estado"]["inventario_limones"] == 2
+    assert res["resultados"][3]["resumen"]["vendido"] == 8
+
+
+def test_lote_aisla_los_errores_de_cada_operacion(juego):
+    res = juego.ejecutar_lote([
+        {"op": "desconocida"},
+        {"op": "produce", "args": {"cantidad": "muchas"}},
+        {"op": "buy", "args": "no es un dict"},
+        3,
+        {"op": "produce", "args": {"cantidad": 5}},  # sin ingredientes
+        {"op": "buy", "args": {"limones": 2}},
+    ])
+    assert [r["ok"] for r in res["resultados"]] == [False, False, False, False, False, True]
+    assert res["estado"]["inventario_limones"] == 2
+
+
+def test_lote_invalida_la_cache_del_estado(juego):
+    antes = juego.estado_publico_json()
+    assert juego.estado_publico_json() is antes  # cacheado entre acciones
+    juego.ejecutar_lote([{"op": "buy", "args": {"limones": 3}}])
+    despues = juego.estado_publico_json()
+    assert despues is not antes
+    assert b'"inventario_limones":3' in despues
+
+
+def test_respuestas_con_estado_dejan_guardada_la_cache(juego):
+    res = juego.simular_dia(incluir_estado=True)
+    cache = juego._estado_json
+    assert cache is not None and juego.estado_publico_json() is cache
+    assert orjson.loads(cache) == orjson.loads(orjson.dumps(res["estado"]))
+
+    juego.ejecutar_lote([{"op": "buy", "args": {"limones": 1}}])
+    assert juego._estado_json is not None and juego._estado_json is not cache
+
+    estado = juego.reset()
+    assert orjson.loads(juego.estado_publico_json()) == orjson.loads(orjson.dumps(estado))
+
+
+# ---------------------- LÍMITES DE LA PARTIDA ----------------------
+@pytest.mark.parametrize("precio", [0, -1, float("nan"), float("inf"), 100.01])
+def test_fijar_precio_rechaza_valores_fuera_de_rango(juego, precio):
+    assert juego.fijar_precio(precio)["ok"] is False
+    assert juego.estado.precio_venta == 1.0
+
+
+def test_compra_rechaza_cantidades_enormes(juego):
+    res = juego.comprar_ingredientes(MAX_UNIDADES_COMPRA + 1, 0, 0)
+    assert res["ok"] is False
+    assert juego.estado.inventario_limones == 0
+    assert juego.comprar_ingredientes(10 ** 30, 0, 0)["ok"] is False
+
+
+def test_nivel_calidad_acotado_y_dia_completo(juego):
+    juego.estado.caja = 1e6
+    res = juego.simular_dia(5e5)
+    assert res["ok"] is True
+    assert juego.estado.nivel_calidad == MAX_NIVEL_CALIDAD
+    assert juego.estado.dia == 2
+    assert juego.estado_publico_json()
+
+
+# ---------------------- ESTADO PÚBLICO ----------------------
+def test_estado_publico_partida_con_semilla(juego):
+    juego.comprar_ingredientes(13, 11, 17)
+    juego.producir(9)
+    juego.fijar_precio(1.13)
+    juego.simular_dia(7.0)
+    estado = juego.get_estado_publico()
+
+    assert estado["historial"] == [{
+        "dia": 1, "clima": "Templado", "demanda": 54, "vendido": 9, "ingresos": 10.17,
+        "coste_ventas": 6.12, "beneficio_dia": 4.05, "caja": 94.21
+    }]
+    assert estado["balance"]["total_activo"] == pytest.approx(97.05)
+    assert estado["cuenta_resultados"]["beneficio"] == pytest.approx(-2.95)
+    assert estado["flujo_efectivo"]["pagos"] == pytest.approx(15.96)
+
+    # mismas fórmulas que los antiguos calcular_balance / cuenta / flujo
+    st = juego.estado
+    valor_ingredientes = (st.inventario_limones * COSTE_LIMON + st.inventario_azucar * COSTE_AZUCAR
+                          + st.inventario_vasos * COSTE_VASO)
+    assert estado["balance"]["activo"] == {
+        "caja": st.caja,
+        "existencias_ingredientes": valor_ingredientes,
+        "existencias_limonada": st.coste_inventario_limonada,
+        "inmovilizado": 0.0
+    }
+    assert estado["balance"]["total_activo"] == sum(estado["balance"]["activo"].values())
+    assert estado["balance"]["total_pasivo_patrimonio"] == st.deuda + st.capital_inicial + st.beneficios_acumulados
+    assert estado["cuenta_resultados"] == {
+        "ingresos": st.ingresos_acumulados,
+        "coste_ventas": st.coste_ventas_acumulado,
+        "gastos_operativos": st.gastos_operativos_acumulado,
+        "beneficio": st.ingresos_acumulados - st.coste_ventas_acumulado - st.gastos_operativos_acumulado
+    }
+    assert estado["flujo_efectivo"] == {
+        "cobros": st.cobros_acumulados, "pagos": st.pagos_acumulados, "saldo_caja": st.caja
+    }